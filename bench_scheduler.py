@@ -0,0 +1,276 @@
+"""Офлайн-бенчмарк рассылок планировщика (daily_announce_14 / daily_remind_1).
+
+Google Sheets подменяется синтетическими таблицами Users и Registrations,
+Telegram — фейковым ботом с задержкой, 429 RetryAfter и «бот заблокирован».
+Каждая рассылка идёт через scheduler_pass, как в scheduler_task: захват
+аренды лидера, heartbeat, prune и её освобождение входят в замер; пропущен
+только сон между проходами. Сеть не нужна, поэтому скрипт можно гонять в CI:
+
+    python bench_scheduler.py --users 1000
+    python bench_scheduler.py --users 200000 --latency 0 --json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from datetime import date, timedelta
+
+EVENT_TITLE = "Мастер и Маргарита"
+
+
+# ======================== FAKE GOOGLE SHEETS ========================
+
+class FakeWorksheet:
+    def __init__(self, records):
+        self.records = records
+
+    def get_all_records(self):
+        # gspread каждый раз отдаёт новый список словарей
+        return [dict(r) for r in self.records]
+
+    def append_row(self, row):
+        pass
+
+
+class FakeSpreadsheet:
+    def __init__(self):
+        self.sheet1 = FakeWorksheet([])
+        self.worksheets = {
+            "Users": FakeWorksheet([]),
+            "Registrations": FakeWorksheet([]),
+        }
+
+    def worksheet(self, name):
+        return self.worksheets[name]
+
+
+class FakeClient:
+    def __init__(self):
+        self.spreadsheet = FakeSpreadsheet()
+
+    def open(self, name):
+        return self.spreadsheet
+
+
+fake_client = FakeClient()
+
+
+def install_fake_google():
+    gspread = types.ModuleType("gspread")
+    gspread.authorize = lambda creds: fake_client
+
+    service_account = types.ModuleType("google.oauth2.service_account")
+    service_account.Credentials = types.SimpleNamespace(
+        from_service_account_file=lambda *args, **kwargs: None
+    )
+    oauth2 = types.ModuleType("google.oauth2")
+    oauth2.service_account = service_account
+    google = types.ModuleType("google")
+    google.oauth2 = oauth2
+
+    sys.modules["gspread"] = gspread
+    sys.modules["google"] = google
+    sys.modules["google.oauth2"] = oauth2
+    sys.modules["google.oauth2.service_account"] = service_account
+
+
+# ======================== SYNTHETIC DATA ========================
+
+def generate_users(n: int):
+    return [
+        {"user_id": 100000 + i, "username": f"user{i}",
+         "first_name": f"Имя{i}", "last_name": f"Фамилия{i}"}
+        for i in range(n)
+    ]
+
+
+def generate_registrations(n: int, users, rng: random.Random):
+    # Половина записей — на ближайшую встречу, остальные — на прошлые
+    titles = [EVENT_TITLE, "Анна Каренина", "Идиот", "Белые ночи"]
+    rows = []
+    for i in range(n):
+        user = users[i % len(users)]
+        title = EVENT_TITLE if i % 2 == 0 else rng.choice(titles[1:])
+        rows.append({
+            "user_id": user["user_id"],
+            "username": user["username"],
+            "name": f"{user['first_name']} {user['last_name']}",
+            "event_title": title,
+            "date": str(date.today()),
+        })
+    return rows
+
+
+def event_row(days_ahead: int, with_cover: bool):
+    return {
+        "Название": EVENT_TITLE,
+        "Автор": "М. Булгаков",
+        "Дата_вечера": (date.today() + timedelta(days=days_ahead)).strftime("%d.%m.%Y"),
+        "Анонс_текст": f"Через две недели обсуждаем «{EVENT_TITLE}».",
+        "Напоминание_текст": f"Завтра встреча по книге «{EVENT_TITLE}».",
+        "Обложка_URL": "https://drive.google.com/file/d/cover123/view" if with_cover else "",
+    }
+
+
+# ======================== FAKE BOT ========================
+
+class FakeBot:
+    def __init__(self, latency: float, rate_limit: float, retry_after: float,
+                 blocked: set, rng: random.Random):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.blocked = blocked
+        self.rng = rng
+        self.calls = 0
+        self.sent = 0
+        self.retries = 0
+        self.blocked_errors = 0
+
+    async def _send(self, chat_id):
+        from telegram.error import Forbidden, RetryAfter
+
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if chat_id in self.blocked:
+            self.blocked_errors += 1
+            raise Forbidden("Forbidden: bot was blocked by the user")
+        if self.rng.random() < self.rate_limit:
+            self.retries += 1
+            raise RetryAfter(self.retry_after)
+        self.sent += 1
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await self._send(chat_id)
+
+    async def send_photo(self, chat_id, photo, **kwargs):
+        await self._send(chat_id)
+
+
+# ======================== RUN ========================
+
+async def run_pass(main, name: str, job, days_ahead: int, args, users, state_dir: str,
+                   trace_memory: bool):
+    rng = random.Random(args.seed)
+    fake_client.spreadsheet.sheet1.records = [event_row(days_ahead, args.cover)]
+
+    # Своё хранилище состояния на каждый прогон: пустой кэш и дедупликация
+    suffix = "mem" if trace_memory else "time"
+    main.state = main.SqliteStateBackend(os.path.join(state_dir, f"{name}-{suffix}.sqlite3"))
+
+    blocked = {u["user_id"] for u in users if rng.random() < args.blocked}
+    bot = FakeBot(args.latency, args.rate_limit, args.retry_after, blocked, rng)
+    context = types.SimpleNamespace(bot=bot)
+
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    if not await main.scheduler_pass(context, [job]):
+        raise RuntimeError("scheduler_pass did not get the leader lease")
+    duration = time.perf_counter() - started
+    peak = 0
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    main.state.conn.close()
+    return bot, duration, peak
+
+
+async def run_job(main, name: str, job, days_ahead: int, args, users, state_dir: str):
+    # Время меряем без tracemalloc (он сильно замедляет), память — отдельным прогоном
+    bot, duration, _ = await run_pass(main, name, job, days_ahead, args, users, state_dir, False)
+    _, _, peak = await run_pass(main, name, job, days_ahead, args, users, state_dir, True)
+
+    return {
+        "job": name,
+        "duration_s": round(duration, 3),
+        "calls": bot.calls,
+        "sent": bot.sent,
+        "msgs_per_s": round(bot.sent / duration, 1) if duration else 0.0,
+        "retries": bot.retries,
+        "blocked": bot.blocked_errors,
+        "peak_mem_mb": round(peak / (1024 * 1024), 2),
+    }
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--users", type=int, default=1000, help="строк в Users (1k–200k)")
+    p.add_argument("--registrations", type=int, default=None,
+                   help="строк в Registrations (по умолчанию = --users)")
+    p.add_argument("--latency", type=float, default=0.002, help="задержка ответа Telegram, сек")
+    p.add_argument("--rate-limit", type=float, default=0.01, help="доля ответов 429")
+    p.add_argument("--retry-after", type=float, default=0.01, help="RetryAfter в 429, сек")
+    p.add_argument("--blocked", type=float, default=0.05, help="доля заблокировавших бота")
+    p.add_argument("--cover", action="store_true", help="анонс с обложкой (send_photo)")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--json", action="store_true", help="вывести результат одной строкой JSON")
+    args = p.parse_args()
+    if args.users < 1:
+        p.error("--users должно быть не меньше 1")
+    if args.registrations is not None and args.registrations < 0:
+        p.error("--registrations не может быть отрицательным")
+    return args
+
+
+async def bench(args, state_dir: str):
+    os.environ.setdefault("BOT_TOKEN", "000000:bench")
+    os.environ["GOOGLE_CREDS_JSON"] = "{}"
+    os.environ["STATE_DB_PATH"] = os.path.join(state_dir, "state.sqlite3")
+    install_fake_google()
+    import main
+
+    rng = random.Random(args.seed)
+    users = generate_users(args.users)
+    registrations_count = args.users if args.registrations is None else args.registrations
+    registrations = generate_registrations(registrations_count, users, rng)
+    fake_client.spreadsheet.worksheets["Users"].records = users
+    fake_client.spreadsheet.worksheets["Registrations"].records = registrations
+
+    results = [
+        await run_job(main, "daily_announce_14", main.daily_announce_14, 14, args, users, state_dir),
+        await run_job(main, "daily_remind_1", main.daily_remind_1, 1, args, users, state_dir),
+    ]
+    main.state.conn.close()
+    return {
+        "users": len(users),
+        "registrations": len(registrations),
+        "results": results,
+    }
+
+
+def main_cli():
+    args = parse_args()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="litcafe-bench-") as state_dir:
+        # main.py пишет credentials.json в текущую папку — уводим его во временную
+        os.chdir(state_dir)
+        try:
+            report = asyncio.run(bench(args, state_dir))
+        finally:
+            os.chdir(cwd)
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+        return
+
+    print(f"Users: {report['users']}, Registrations: {report['registrations']}")
+    for r in report["results"]:
+        print(
+            f"{r['job']:<18} {r['duration_s']:>8.3f}s  sent={r['sent']:<7} "
+            f"{r['msgs_per_s']:>9.1f} msg/s  retries={r['retries']:<5} "
+            f"blocked={r['blocked']:<5} peak={r['peak_mem_mb']} MB"
+        )
+
+
+if __name__ == "__main__":
+    main_cli()
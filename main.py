@@ -16,6 +16,7 @@ from telegram.ext import (
     ContextTypes,
     filters
 )
+from telegram.error import BadRequest, Forbidden, RetryAfter
 
 import gspread
 from google.oauth2.service_account import Credentials
@@ -23,6 +24,12 @@ import re
 import aiohttp
 import asyncio
 import os
+import json
+import socket
+import sqlite3
+import time
+import threading
+from abc import ABC, abstractmethod
 
 # ======================== НАСТРОЙКИ ========================
 
@@ -46,6 +53,28 @@ GOOGLE_CREDS_FILE = "credentials.json"
 
 MAX_TG_FILE_SIZE = 50 * 1024 * 1024  # 50 MB
 
+# Общее состояние воркеров (кэш, дедупликация рассылок, лидер планировщика).
+# Несколько воркеров — это отдельные процессы/контейнеры, у каждого свой PORT
+# (run_webhook слушает один порт), а балансировщик раздаёт им запросы с
+# WEBHOOK_URL. STATE_DB_PATH у всех должен указывать на один и тот же файл
+# на общем томе (SQLite — только в пределах одной машины, не сетевая ФС);
+# иначе каждый воркер станет лидером и разошлёт рассылку сам.
+STATE_BACKEND = os.getenv("STATE_BACKEND", "sqlite")
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "bot_state.sqlite3")
+INSTANCE_ID = os.getenv("INSTANCE_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+SCHEDULER_INTERVAL = 3600  # секунд между проходами планировщика
+LEADER_LEASE_SECONDS = 300  # аренда лидера; продлевается, пока идёт рассылка
+BOOKS_CACHE_TTL = 60
+BROADCAST_MARKS_TTL = 30 * 24 * 3600  # отметки о рассылках храним месяц
+BROADCAST_CLAIM_TIMEOUT = 1800  # занятый, но не отправленный ключ считаем брошенным
+
+MAX_PARALLEL_TRANSFERS = int(os.getenv("MAX_PARALLEL_TRANSFERS", 3))
+TG_FILE_ID_TTL = 24 * 3600  # file_id уже загруженной книги переиспользуем сутки
+
+BROADCAST_MAX_RETRIES = 3  # повторы одного сообщения рассылки при 429
+BROADCAST_BATCH = 500  # столько ключей рассылки занимаем за одну транзакцию
+
 # ======================== ЛОГИ ========================
 
 logging.basicConfig(
@@ -55,6 +84,201 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# ======================== SHARED STATE ========================
+# Несколько webhook-воркеров работают с одним хранилищем: общий кэш,
+# отметки об отправленных рассылках и лидер-лок, чтобы scheduler_task
+# крутился ровно в одном экземпляре.
+
+class StateBackend(ABC):
+    """Интерфейс хранилища общего состояния между воркерами."""
+
+    @abstractmethod
+    def cache_get(self, key: str):
+        ...
+
+    @abstractmethod
+    def cache_set(self, key: str, value, ttl: float):
+        ...
+
+    @abstractmethod
+    def cache_delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def claim_many(self, keys: list[str], owner: str, stale_after: float) -> set[str]:
+        """Занять ключи рассылки; вернуть те, что заняли мы.
+
+        Ключ можно занять, если его ещё нет или он занят, но не отправлен
+        дольше stale_after секунд (воркер упал посреди рассылки).
+        """
+
+    @abstractmethod
+    def mark_sent(self, key: str):
+        """Отметить ключ отправленным — больше его никто не займёт."""
+
+    @abstractmethod
+    def release_claims(self, keys: list[str]):
+        """Снять неотправленные ключи, чтобы их взял следующий проход."""
+
+    @abstractmethod
+    def acquire_leader(self, name: str, owner: str, ttl: float) -> bool:
+        """Захватить или продлить аренду лидера. True — лидер мы."""
+
+    @abstractmethod
+    def release_leader(self, name: str, owner: str):
+        """Отдать аренду, если она всё ещё наша."""
+
+    @abstractmethod
+    def prune(self, sent_ttl: float):
+        """Удалить протухший кэш и отметки старше sent_ttl секунд."""
+
+
+class SqliteStateBackend(StateBackend):
+    """Локальный SQLite-файл: подходит для воркеров на одной машине/томе."""
+
+    def __init__(self, path: str):
+        self.path = path
+        # Одно соединение на процесс; методы зовутся из asyncio.to_thread
+        self.conn = sqlite3.connect(
+            path, timeout=10, isolation_level=None, check_same_thread=False
+        )
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache "
+                "(key TEXT PRIMARY KEY, value TEXT, expires REAL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS broadcast_marks "
+                "(key TEXT PRIMARY KEY, status TEXT, owner TEXT, created REAL, claimed REAL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS leader "
+                "(name TEXT PRIMARY KEY, owner TEXT, expires REAL)"
+            )
+
+    def _transaction(self, work):
+        # BEGIN IMMEDIATE держит блокировку записи для всех воркеров —
+        # при любой ошибке транзакцию обязательно откатываем
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work()
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return result
+
+    def cache_get(self, key: str):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value, expires FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        if not row or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def cache_set(self, key: str, value, ttl: float):
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), time.time() + ttl)
+            )
+
+    def cache_delete(self, key: str):
+        with self.lock:
+            self.conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def claim_many(self, keys: list[str], owner: str, stale_after: float) -> set[str]:
+        now = time.time()
+
+        def work():
+            claimed = set()
+            for key in keys:
+                cur = self.conn.execute(
+                    "INSERT INTO broadcast_marks (key, status, owner, created, claimed) "
+                    "VALUES (?, 'claimed', ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, claimed = excluded.claimed "
+                    "WHERE status = 'claimed' AND claimed < ?",
+                    (key, owner, now, now, now - stale_after)
+                )
+                if cur.rowcount == 1:
+                    claimed.add(key)
+            return claimed
+
+        # Одна транзакция на пачку — одна запись в журнал вместо одной на получателя
+        return self._transaction(work)
+
+    def mark_sent(self, key: str):
+        with self.lock:
+            self.conn.execute(
+                "UPDATE broadcast_marks SET status = 'sent' WHERE key = ?", (key,)
+            )
+
+    def release_claims(self, keys: list[str]):
+        self._transaction(lambda: self.conn.executemany(
+            "DELETE FROM broadcast_marks WHERE key = ? AND status = 'claimed'",
+            [(key,) for key in keys]
+        ))
+
+    def acquire_leader(self, name: str, owner: str, ttl: float) -> bool:
+        now = time.time()
+
+        def work():
+            row = self.conn.execute(
+                "SELECT owner, expires FROM leader WHERE name = ?", (name,)
+            ).fetchone()
+            if row and row[0] != owner and row[1] > now:
+                return False
+            self.conn.execute(
+                "INSERT OR REPLACE INTO leader (name, owner, expires) VALUES (?, ?, ?)",
+                (name, owner, now + ttl)
+            )
+            return True
+
+        return self._transaction(work)
+
+    def release_leader(self, name: str, owner: str):
+        with self.lock:
+            self.conn.execute(
+                "DELETE FROM leader WHERE name = ? AND owner = ?", (name, owner)
+            )
+
+    def prune(self, sent_ttl: float):
+        now = time.time()
+
+        def work():
+            self.conn.execute("DELETE FROM cache WHERE expires < ?", (now,))
+            self.conn.execute(
+                "DELETE FROM broadcast_marks WHERE created < ?", (now - sent_ttl,)
+            )
+
+        self._transaction(work)
+
+
+# Для воркеров на разных машинах сюда добавляется, например, Redis-реализация
+STATE_BACKENDS = {
+    "sqlite": lambda: SqliteStateBackend(STATE_DB_PATH),
+}
+
+if STATE_BACKEND not in STATE_BACKENDS:
+    raise ValueError(f"❗ Неизвестный STATE_BACKEND: {STATE_BACKEND}")
+
+state = STATE_BACKENDS[STATE_BACKEND]()
+
+if STATE_BACKEND == "sqlite":
+    logger.info(
+        "Shared state: %s (instance %s). All workers must use the same file "
+        "on a shared volume, otherwise each one broadcasts on its own.",
+        os.path.abspath(STATE_DB_PATH), INSTANCE_ID
+    )
+    if "STATE_DB_PATH" not in os.environ:
+        logger.warning("STATE_DB_PATH is not set: state lives inside this container only")
+
+
 # ======================== GOOGLE SHEETS ========================
 
 SCOPES = [
@@ -67,8 +291,18 @@ gc = gspread.authorize(creds)
 sheet = gc.open(GOOGLE_SHEET_NAME).sheet1
 
 
-def get_books():
-    return sheet.get_all_records()
+def load_books():
+    # Общий кэш: все воркеры видят одинаковый список (и индексы в callback_data)
+    books = state.cache_get("books")
+    if books is None:
+        books = sheet.get_all_records()
+        state.cache_set("books", books, BOOKS_CACHE_TTL)
+    return books
+
+
+async def get_books():
+    # Хранилище может ждать блокировку другого воркера — не держим event loop
+    return await asyncio.to_thread(load_books)
 
 
 # ======================== USERS ========================
@@ -182,8 +416,8 @@ def get_chat_id(src) -> int | None:
 
 # ======================== EVENTS ========================
 
-def get_next_event():
-    records = sheet.get_all_records()
+async def get_next_event():
+    records = await get_books()
     today = date.today()
     events = []
 
@@ -228,8 +462,8 @@ def get_event_row(title: str):
             return row
     return None
 
-def get_book_by_title(title: str):
-    for book in get_books():
+async def get_book_by_title(title: str):
+    for book in await get_books():
         if book.get("Название") == title:
             return book
     return None
@@ -238,53 +472,171 @@ def get_book_by_title(title: str):
 
 # ======================== FILE SENDING ========================
 
-async def send_pdf(src, context, link: str, title: str):
-    chat_id = get_chat_id(src)
-    if not chat_id:
-        return
+# Одновременно качаем и грузим в Telegram не больше MAX_PARALLEL_TRANSFERS
+# файлов (каждый до 50 MB): слот держится от начала скачивания до конца
+# загрузки. Одна и та же книга качается один раз и грузится байтами одному
+# из ожидающих — остальные получают её по file_id, как и все последующие запросы.
+transfer_slots = asyncio.Semaphore(MAX_PARALLEL_TRANSFERS)
+active_transfers: dict[str, asyncio.Task] = {}
+transfer_waiters: dict[str, list] = {}
+queued_transfers: dict[str, int] = {}  # файл -> номер в очереди за слотом
+transfers_in_flight = 0
+transfer_tickets = 0
 
-    if not link:
-        await context.bot.send_message(chat_id, "PDF недоступен.")
-        return
 
-    data, size = await download_drive_file(link)
+def queue_position(key: str) -> int:
+    ticket = queued_transfers.get(key)
+    if ticket is None:
+        return 0
+    return sum(1 for t in queued_transfers.values() if t <= ticket)
 
-    if size and size > MAX_TG_FILE_SIZE:
-        await context.bot.send_message(chat_id, f"Файл слишком большой.\n{link}")
+
+def resolve(fut: asyncio.Future, result):
+    # Ожидающий мог уже уйти (отмена) — тогда результат ему не нужен
+    if not fut.done():
+        fut.set_result(result)
+
+
+async def transfer_book(key: str, link: str, context, filename: str):
+    global transfers_in_flight
+    created = time.monotonic()
+    waiters = transfer_waiters[key]
+    status, file_id = "error", None
+    try:
+        async with transfer_slots:
+            queued_transfers.pop(key, None)
+            started = time.monotonic()
+            data, size = await download_drive_file(link)
+            downloaded = time.monotonic()
+
+            if size and size > MAX_TG_FILE_SIZE:
+                status = "too_big"
+            elif data:
+                # Байты грузим первому ожидающему; не вышло (заблокировал бота,
+                # таймаут) — следующему, пока не получим file_id
+                while waiters and not file_id:
+                    chat_id, intro, fut = waiters.pop(0)
+                    if fut.done():
+                        continue
+                    try:
+                        if intro:
+                            await context.bot.send_message(chat_id, intro, parse_mode="Markdown")
+                        msg = await context.bot.send_document(
+                            chat_id=chat_id, document=data, filename=filename
+                        )
+                    except Exception as e:
+                        logger.warning("Upload %s to %s failed: %s", filename, chat_id, e)
+                        resolve(fut, ("error", None))
+                        continue
+                    finished = time.monotonic()
+                    resolve(fut, ("sent", None))
+
+                    download_time = max(downloaded - started, 1e-6)
+                    upload_time = max(finished - downloaded, 1e-6)
+                    logger.info(
+                        "Transfer %s: %d bytes, queue %.2fs, download %.2fs (%.2f MB/s), "
+                        "upload %.2fs (%.2f MB/s)",
+                        filename, len(data), started - created,
+                        download_time, len(data) / download_time / (1024 * 1024),
+                        upload_time, len(data) / upload_time / (1024 * 1024)
+                    )
+
+                    file_id = msg.document.file_id if msg.document else None
+                    if file_id:
+                        await asyncio.to_thread(
+                            state.cache_set, f"tg_file:{key}", file_id, TG_FILE_ID_TTL
+                        )
+                status = "file_id" if file_id else "error"
+    finally:
+        transfers_in_flight -= 1
+        queued_transfers.pop(key, None)
+        active_transfers.pop(key, None)
+        transfer_waiters.pop(key, None)
+        for _, _, fut in waiters:
+            resolve(fut, (status, file_id))
+
+
+async def send_cached_document(chat_id: int, context, key: str, file_id: str,
+                               intro: str | None) -> bool:
+    try:
+        if intro:
+            await context.bot.send_message(chat_id, intro, parse_mode="Markdown")
+        await context.bot.send_document(chat_id, file_id)
+        return True
+    except BadRequest as e:
+        # Telegram не принял file_id — забываем его и качаем файл заново
+        logger.warning("Cached file_id for %s rejected: %s", key, e)
+        await asyncio.to_thread(state.cache_delete, f"tg_file:{key}")
+        return False
+
+
+async def deliver_document(chat_id: int, context, link: str, filename: str,
+                           error_text: str, intro: str | None = None):
+    global transfers_in_flight, transfer_tickets
+    key = extract_drive_id(link) or link
+
+    file_id = await asyncio.to_thread(state.cache_get, f"tg_file:{key}")
+    if file_id:
+        if await send_cached_document(chat_id, context, key, file_id, intro):
+            return
+        intro = None  # уже отправлено
+
+    fut = asyncio.get_running_loop().create_future()
+    transfer_waiters.setdefault(key, []).append((chat_id, intro, fut))
+    if key not in active_transfers:
+        # Место в очереди резервируем сразу, до первого await
+        transfers_in_flight += 1
+        if transfers_in_flight > MAX_PARALLEL_TRANSFERS:
+            transfer_tickets += 1
+            queued_transfers[key] = transfer_tickets
+        active_transfers[key] = asyncio.create_task(
+            transfer_book(key, link, context, filename)
+        )
+
+    position = queue_position(key)
+    if position:
+        await context.bot.send_message(
+            chat_id, f"⏳ Сейчас отправляется много книг. Вы в очереди: {position}"
+        )
+
+    status, file_id = await fut
+
+    if status == "sent":
         return
 
-    if not data:
-        await context.bot.send_message(chat_id, "Ошибка загрузки PDF.")
+    if status == "file_id" and await send_cached_document(chat_id, context, key, file_id, intro):
         return
 
-    await context.bot.send_message(chat_id, "📖 *Вот ваша книга:*", parse_mode="Markdown")
-    await context.bot.send_document(
-        chat_id=chat_id,
-        document=data,
-        filename=f"{title}.pdf"
-    )
+    if status == "too_big":
+        await context.bot.send_message(chat_id, f"Файл слишком большой.\n{link}")
+        return
 
+    await context.bot.send_message(chat_id, error_text)
 
-async def send_file(src, context, link: str, ext: str, title: str):
+
+async def send_pdf(src, context, link: str, title: str):
     chat_id = get_chat_id(src)
     if not chat_id:
         return
 
     if not link:
-        await context.bot.send_message(chat_id, "Файл недоступен.")
+        await context.bot.send_message(chat_id, "PDF недоступен.")
         return
 
-    data, size = await download_drive_file(link)
+    await deliver_document(chat_id, context, link, f"{title}.pdf",
+                           "Ошибка загрузки PDF.", intro="📖 *Вот ваша книга:*")
 
-    if size and size > MAX_TG_FILE_SIZE:
-        await context.bot.send_message(chat_id, f"Файл слишком большой.\n{link}")
+
+async def send_file(src, context, link: str, ext: str, title: str):
+    chat_id = get_chat_id(src)
+    if not chat_id:
         return
 
-    if not data:
-        await context.bot.send_message(chat_id, "Ошибка загрузки файла.")
+    if not link:
+        await context.bot.send_message(chat_id, "Файл недоступен.")
         return
 
-    await context.bot.send_document(chat_id, data, filename=f"{title}.{ext}")
+    await deliver_document(chat_id, context, link, f"{title}.{ext}", "Ошибка загрузки файла.")
 
 
 # ======================== HANDLERS ========================
@@ -400,7 +752,7 @@ async def on_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 async def library(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    books = get_books()
+    books = await get_books()
     if not books:
         await update.message.reply_text("Библиотека пуста 📚")
         return
@@ -415,8 +767,53 @@ async def library(update: Update, context: ContextTypes.DEFAULT_TYPE):
         reply_markup=InlineKeyboardMarkup(keyboard)
     )
 
+async def send_with_retry(send, *args, **kwargs):
+    # Telegram при флуд-контроле отвечает 429 и говорит, сколько подождать
+    for attempt in range(BROADCAST_MAX_RETRIES + 1):
+        try:
+            return await send(*args, **kwargs)
+        except RetryAfter as e:
+            if attempt == BROADCAST_MAX_RETRIES:
+                raise
+            await asyncio.sleep(e.retry_after)
+
+
+async def broadcast(job_key: str, user_ids, send_one):
+    # Ключ занимаем до отправки (чтобы другой воркер не отправил дубль) и
+    # помечаем отправленным только после успеха. Временная ошибка или отмена
+    # (редеплой, SIGTERM) снимают занятые ключи — их возьмёт следующий проход;
+    # если процесс убит, ключи освободятся через BROADCAST_CLAIM_TIMEOUT.
+    user_ids = list(user_ids)
+    for i in range(0, len(user_ids), BROADCAST_BATCH):
+        batch = user_ids[i:i + BROADCAST_BATCH]
+        keys = {uid: f"{job_key}:{uid}" for uid in batch}
+        claimed = await asyncio.to_thread(
+            state.claim_many, list(keys.values()), INSTANCE_ID, BROADCAST_CLAIM_TIMEOUT
+        )
+        pending = set(claimed)
+
+        try:
+            for uid in batch:
+                key = keys[uid]
+                if key not in pending:
+                    continue
+                try:
+                    await send_one(uid)
+                except Forbidden:
+                    # Бот заблокирован — повторять бессмысленно
+                    pass
+                except Exception as e:
+                    logger.warning("Broadcast %s to %s failed: %s", job_key, uid, e)
+                    continue
+                await asyncio.to_thread(state.mark_sent, key)
+                pending.discard(key)
+        finally:
+            if pending:
+                await asyncio.to_thread(state.release_claims, list(pending))
+
+
 async def daily_announce_14(context):
-    result = get_next_event()
+    result = await get_next_event()
     if not result:
         return
 
@@ -435,20 +832,19 @@ async def daily_announce_14(context):
         [InlineKeyboardButton("Начать читать", callback_data=f"formats_title_{title}")]
     ]
 
-    for uid in get_all_user_ids():
-        try:
-            if cover:
-                await context.bot.send_photo(uid, cover, caption=text,
-                                              reply_markup=InlineKeyboardMarkup(keyboard))
-            else:
-                await context.bot.send_message(uid, text,
-                                               reply_markup=InlineKeyboardMarkup(keyboard))
-        except:
-            continue
+    async def send_one(uid):
+        if cover:
+            await send_with_retry(context.bot.send_photo, uid, cover, caption=text,
+                                  reply_markup=InlineKeyboardMarkup(keyboard))
+        else:
+            await send_with_retry(context.bot.send_message, uid, text,
+                                  reply_markup=InlineKeyboardMarkup(keyboard))
+
+    await broadcast(f"announce14:{event_date}:{title}", get_all_user_ids(), send_one)
 
 
 async def daily_remind_1(context):
-    result = get_next_event()
+    result = await get_next_event()
     if not result:
         return
 
@@ -465,15 +861,14 @@ async def daily_remind_1(context):
     rows = reg_sheet.get_all_records()
     user_ids = [r["user_id"] for r in rows if r["event_title"] == title]
 
-    for uid in user_ids:
-        try:
-            await context.bot.send_message(uid, text)
-        except:
-            continue
+    async def send_one(uid):
+        await send_with_retry(context.bot.send_message, uid, text)
+
+    await broadcast(f"remind1:{event_date}:{title}", user_ids, send_one)
 
 
 async def book_details(update: Update, context: ContextTypes.DEFAULT_TYPE, index: int):
-    book = get_books()[index]
+    book = (await get_books())[index]
 
     title = book["Название"]
     author = book.get("Автор")
@@ -499,7 +894,7 @@ async def book_details(update: Update, context: ContextTypes.DEFAULT_TYPE, index
 
 
 async def events(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    result = get_next_event()
+    result = await get_next_event()
     if not result:
         await update.message.reply_text("Пока встреч нет.")
         return
@@ -543,7 +938,7 @@ async def callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         title_raw = data.replace("formats_title_", "")
 
         # нормализуем название (важно!)
-        books = get_books()
+        books = await get_books()
         norm_title = title_raw.strip().lower()
 
         book = next(
@@ -578,7 +973,7 @@ async def callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # ----------- 3) БИБЛИОТЕКА: показать форматы ----------
     if data.startswith("formats_"):
         idx = int(data.split("_")[1])
-        books = get_books()
+        books = await get_books()
         book = books[idx]
 
         keyboard = []
@@ -598,25 +993,26 @@ async def callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     # ----------- 4) Загрузка файлов ----------
+    # (отвечаем на callback сразу: передача большой книги может идти долго)
     if data.startswith("getpdf_"):
         idx = int(data.split("_")[1])
-        book = get_books()[idx]
-        await send_pdf(query, context, book.get("PDF_ссылка", ""), book["Название"])
+        book = (await get_books())[idx]
         await query.answer()
+        await send_pdf(query, context, book.get("PDF_ссылка", ""), book["Название"])
         return
 
     if data.startswith("getepub_"):
         idx = int(data.split("_")[1])
-        book = get_books()[idx]
-        await send_file(query, context, book.get("EPUB_ссылка", ""), "epub", book["Название"])
+        book = (await get_books())[idx]
         await query.answer()
+        await send_file(query, context, book.get("EPUB_ссылка", ""), "epub", book["Название"])
         return
 
     if data.startswith("getfb2_"):
         idx = int(data.split("_")[1])
-        book = get_books()[idx]
-        await send_file(query, context, book.get("FB2_ссылка", ""), "fb2", book["Название"])
+        book = (await get_books())[idx]
         await query.answer()
+        await send_file(query, context, book.get("FB2_ссылка", ""), "fb2", book["Название"])
         return
 
     # ----------- 5) Запись на мероприятие ----------
@@ -642,6 +1038,35 @@ async def callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 from telegram.ext import CallbackContext
 
+async def leader_heartbeat():
+    # Продлеваем аренду, пока идёт рассылка: она может длиться дольше аренды
+    while True:
+        await asyncio.sleep(LEADER_LEASE_SECONDS / 3)
+        renewed = await asyncio.to_thread(
+            state.acquire_leader, "scheduler", INSTANCE_ID, LEADER_LEASE_SECONDS
+        )
+        if not renewed:
+            logger.warning("Scheduler lease lost by %s", INSTANCE_ID)
+
+
+async def scheduler_pass(context, jobs=None):
+    # Рассылки делает только лидер; остальные воркеры ждут своей очереди
+    if not await asyncio.to_thread(state.acquire_leader, "scheduler",
+                                   INSTANCE_ID, LEADER_LEASE_SECONDS):
+        return False
+
+    heartbeat = asyncio.create_task(leader_heartbeat())
+    try:
+        await asyncio.to_thread(state.prune, BROADCAST_MARKS_TTL)
+        for job in jobs or (daily_announce_14, daily_remind_1):
+            await job(context)
+    finally:
+        heartbeat.cancel()
+        # Отдаём аренду сразу — в том числе при остановке процесса
+        await asyncio.to_thread(state.release_leader, "scheduler", INSTANCE_ID)
+    return True
+
+
 async def scheduler_task(app):
     await asyncio.sleep(3)
 
@@ -649,12 +1074,11 @@ async def scheduler_task(app):
 
     while True:
         try:
-            await daily_announce_14(context)
-            await daily_remind_1(context)
+            await scheduler_pass(context)
         except Exception as e:
             print("Scheduler error:", e)
 
-        await asyncio.sleep(3600)
+        await asyncio.sleep(SCHEDULER_INTERVAL)
 
 # ======================== MAIN ========================
 
@@ -666,7 +1090,7 @@ async def run_bot():
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, on_text))
     app.add_handler(CallbackQueryHandler(callback))
 
-    # Сcheduler запускается в фоне
+    # Сcheduler запускается в фоне в каждом воркере, но работает только лидер
     asyncio.create_task(scheduler_task(app))
 
     # Keep-alive server